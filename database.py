@@ -3,16 +3,22 @@
 Database class for storing and querying stock financial data.
 """
 
+import functools
 import os
 import sqlite3
+import threading
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 from typing import Optional
 
-from stock import Stock, ValueFormatter
+import numpy as np
+import pandas as pd
 
+from stock import FreeCashFlowData, Stock, ValueFormatter, average_fcf_batch
 
-@dataclass
+
+@dataclass(slots=True)
 class StockRecord:
     """Represents a stock record from the database."""
     ticker: str
@@ -60,18 +66,73 @@ class StockDatabase:
         "stocks.db"
     )
     
-    def __init__(self, db_path: Optional[str] = None):
+    FCF_YEARS = (2025, 2024, 2023, 2022, 2021)
+    
+    # Columns in StockRecord field order, so rows map positionally onto StockRecord
+    _SELECT_RECORDS = """
+        SELECT ticker, company_name, enterprise_value, fcf_2025, fcf_2024,
+               fcf_2023, fcf_2022, fcf_2021, average_fcf, fcf_yield, last_updated
+        FROM stock_financials"""
+    
+    _UPSERT_SQL = """
+        INSERT OR REPLACE INTO stock_financials 
+        (ticker, company_name, enterprise_value, fcf_2025, fcf_2024, 
+         fcf_2023, fcf_2022, fcf_2021, average_fcf, fcf_yield, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, read_only: bool = False):
         """
         Initialize database connection.
         
         Args:
             db_path: Path to SQLite database file. Uses default if not provided.
+            read_only: Open connections in read-only mode (for query-only callers)
         """
         self.db_path = db_path or self.DEFAULT_DB_PATH
+        self.read_only = read_only
+        self._local = threading.local()
+        # One fixed SQL string per year so sqlite3's statement cache reuses the prepared statement
+        self._update_fcf_sql = {year: self._build_update_fcf_sql(year) for year in self.FCF_YEARS}
     
     def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection."""
-        return sqlite3.connect(self.db_path)
+        """
+        Get database connection.
+        
+        Each thread reuses a single connection (sqlite3 connections must not
+        be shared across threads), so the open and PRAGMA setup cost is only
+        paid once per thread instead of on every query.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.read_only:
+                # Read-only connections never take write locks; under WAL they
+                # read alongside the writer without blocking
+                uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+                conn = sqlite3.connect(uri, uri=True)
+            else:
+                conn = sqlite3.connect(self.db_path)
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-20000")
+            # SQL ROUND() rounds half away from zero; statements use Python's
+            # round() instead so fcf_yield matches _calculate_fcf_yield exactly
+            conn.create_function("py_round", 2, self._py_round, deterministic=True)
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def _py_round(value: Optional[float], digits: int) -> Optional[float]:
+        """Python's round() as a SQL function, passing NULL through."""
+        return None if value is None else round(value, digits)
+    
+    def close(self):
+        """Close the calling thread's database connection, if open."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
     
     def create_tables(self):
         """Create database tables if they don't exist."""
@@ -92,11 +153,16 @@ class StockDatabase:
                 )
             """)
             # Add columns if they don't exist (for existing databases)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(stock_financials)")}
             for column in ["average_fcf", "fcf_yield"]:
-                try:
+                if column not in existing:
                     conn.execute(f"ALTER TABLE stock_financials ADD COLUMN {column} REAL")
-                except sqlite3.OperationalError:
-                    pass  # Column already exists
+            # Partial index so get_top_by_yield reads the top rows in order instead of sorting
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_fcf_yield
+                ON stock_financials (fcf_yield DESC)
+                WHERE fcf_yield IS NOT NULL
+            """)
             conn.commit()
         print(f"Database ready: {self.db_path}")
     
@@ -117,6 +183,39 @@ class StockDatabase:
         
         return sum(valid_values) / len(valid_values)
     
+    @staticmethod
+    def _average_fcf_sql(columns: list[str]) -> str:
+        """
+        Build a SQL expression applying the _calculate_average_fcf rules
+        to the given FCF column expressions.
+        """
+        values = [f"COALESCE({c}, 0)" for c in columns]
+        valid_count = " + ".join(f"({c} IS NOT NULL)" for c in columns)
+        return (
+            f"CASE WHEN MIN({', '.join(values)}) < 0 THEN NULL "
+            f"ELSE ({' + '.join(values)}) * 1.0 / NULLIF({valid_count}, 0) END"
+        )
+    
+    def _build_update_fcf_sql(self, year: int) -> str:
+        """
+        Build the UPDATE statement for one FCF year.
+        
+        average_fcf and fcf_yield are recomputed in the same statement, with
+        the new value substituted for the year being updated (SET expressions
+        see the row's old values).
+        """
+        columns = [":value" if y == year else f"fcf_{y}" for y in self.FCF_YEARS]
+        average_fcf = self._average_fcf_sql(columns)
+        return f"""
+            UPDATE stock_financials 
+            SET fcf_{year} = :value,
+                average_fcf = {average_fcf},
+                fcf_yield = CASE WHEN enterprise_value > 0
+                            THEN py_round(({average_fcf}) / enterprise_value, 3) END,
+                last_updated = :now
+            WHERE ticker = :ticker
+        """
+    
     def _calculate_fcf_yield(self, average_fcf: Optional[float], enterprise_value: Optional[float]) -> Optional[float]:
         """
         Calculate FCF yield (average FCF / enterprise value), rounded to 3 decimals.
@@ -132,15 +231,8 @@ class StockDatabase:
             return None
         return round(average_fcf / enterprise_value, 3)
     
-    def upsert(self, data: dict, company_name: str):
-        """
-        Insert or update stock data.
-        Automatically recalculates average_fcf and fcf_yield.
-        
-        Args:
-            data: Dictionary with ticker and financial data
-            company_name: Company name
-        """
+    def _build_row(self, data: dict, company_name: str, last_updated: str) -> tuple:
+        """Build the stock_financials row for a stock, recalculating derived columns."""
         # Always recalculate average_fcf from the FCF values
         fcf_values = [
             data.get("fcf_2025"),
@@ -155,25 +247,47 @@ class StockDatabase:
         enterprise_value = data.get("enterprise_value")
         fcf_yield = self._calculate_fcf_yield(average_fcf, enterprise_value)
         
+        return (
+            data["ticker"],
+            company_name,
+            enterprise_value,
+            *fcf_values,
+            average_fcf,
+            fcf_yield,
+            last_updated,
+        )
+    
+    def upsert(self, data: dict, company_name: str):
+        """
+        Insert or update stock data.
+        Automatically recalculates average_fcf and fcf_yield.
+        
+        Args:
+            data: Dictionary with ticker and financial data
+            company_name: Company name
+        """
+        row = self._build_row(data, company_name, datetime.now().isoformat())
+        
         with self._get_connection() as conn:
-            conn.execute("""
-                INSERT OR REPLACE INTO stock_financials 
-                (ticker, company_name, enterprise_value, fcf_2025, fcf_2024, 
-                 fcf_2023, fcf_2022, fcf_2021, average_fcf, fcf_yield, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                data["ticker"],
-                company_name,
-                enterprise_value,
-                data.get("fcf_2025"),
-                data.get("fcf_2024"),
-                data.get("fcf_2023"),
-                data.get("fcf_2022"),
-                data.get("fcf_2021"),
-                average_fcf,
-                fcf_yield,
-                datetime.now().isoformat()
-            ))
+            conn.execute(self._UPSERT_SQL, row)
+            conn.commit()
+    
+    def upsert_many(self, items: list[tuple[dict, str]]):
+        """
+        Insert or update many stocks in a single transaction.
+        Automatically recalculates average_fcf and fcf_yield.
+        
+        Args:
+            items: List of (data, company_name) pairs, as passed to upsert()
+        """
+        if not items:
+            return
+        
+        now = datetime.now().isoformat()
+        rows = [self._build_row(data, company_name, now) for data, company_name in items]
+        
+        with self._get_connection() as conn:
+            conn.executemany(self._UPSERT_SQL, rows)
             conn.commit()
     
     def get(self, ticker: str) -> Optional[StockRecord]:
@@ -188,49 +302,22 @@ class StockDatabase:
         """
         with self._get_connection() as conn:
             cursor = conn.execute(
-                "SELECT * FROM stock_financials WHERE ticker = ?", 
+                f"{self._SELECT_RECORDS} WHERE ticker = ?", 
                 (ticker.upper(),)
             )
             row = cursor.fetchone()
         
         if row:
-            return StockRecord(
-                ticker=row[0],
-                company_name=row[1],
-                enterprise_value=row[2],
-                fcf_2025=row[3],
-                fcf_2024=row[4],
-                fcf_2023=row[5],
-                fcf_2022=row[6],
-                fcf_2021=row[7],
-                average_fcf=row[8] if len(row) > 8 else None,
-                fcf_yield=row[9] if len(row) > 9 else None,
-                last_updated=row[10] if len(row) > 10 else row[8]
-            )
+            return StockRecord(*row)
         return None
     
     def get_all(self) -> list[StockRecord]:
         """Get all stock records."""
         with self._get_connection() as conn:
-            cursor = conn.execute("SELECT * FROM stock_financials ORDER BY ticker")
+            cursor = conn.execute(f"{self._SELECT_RECORDS} ORDER BY ticker")
             rows = cursor.fetchall()
         
-        return [
-            StockRecord(
-                ticker=row[0],
-                company_name=row[1],
-                enterprise_value=row[2],
-                fcf_2025=row[3],
-                fcf_2024=row[4],
-                fcf_2023=row[5],
-                fcf_2022=row[6],
-                fcf_2021=row[7],
-                average_fcf=row[8] if len(row) > 8 else None,
-                fcf_yield=row[9] if len(row) > 9 else None,
-                last_updated=row[10] if len(row) > 10 else row[8]
-            )
-            for row in rows
-        ]
+        return [StockRecord(*row) for row in rows]
     
     def count(self) -> int:
         """Get total number of records."""
@@ -241,30 +328,15 @@ class StockDatabase:
     def get_top_by_yield(self, limit: int = 30) -> list[StockRecord]:
         """Get top stocks sorted by FCF yield (highest first)."""
         with self._get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT * FROM stock_financials 
+            cursor = conn.execute(f"""
+                {self._SELECT_RECORDS}
                 WHERE fcf_yield IS NOT NULL 
                 ORDER BY fcf_yield DESC
                 LIMIT ?
             """, (limit,))
             rows = cursor.fetchall()
         
-        return [
-            StockRecord(
-                ticker=row[0],
-                company_name=row[1],
-                enterprise_value=row[2],
-                fcf_2025=row[3],
-                fcf_2024=row[4],
-                fcf_2023=row[5],
-                fcf_2022=row[6],
-                fcf_2021=row[7],
-                average_fcf=row[8] if len(row) > 8 else None,
-                fcf_yield=row[9] if len(row) > 9 else None,
-                last_updated=row[10] if len(row) > 10 else row[8]
-            )
-            for row in rows
-        ]
+        return [StockRecord(*row) for row in rows]
     
     def update_fcf(self, ticker: str, year: int, value: Optional[float]) -> bool:
         """
@@ -278,38 +350,18 @@ class StockDatabase:
         Returns:
             True if updated, False if ticker not found
         """
-        if year not in (2021, 2022, 2023, 2024, 2025):
+        if year not in self._update_fcf_sql:
             raise ValueError(f"Year must be 2021-2025, got {year}")
         
-        # Get existing record
-        record = self.get(ticker)
-        if record is None:
-            return False
-        
-        # Build current FCF values, updating the specified year
-        fcf_values = {
-            2025: record.fcf_2025,
-            2024: record.fcf_2024,
-            2023: record.fcf_2023,
-            2022: record.fcf_2022,
-            2021: record.fcf_2021,
-        }
-        fcf_values[year] = value
-        
-        # Recalculate average and yield
-        average_fcf = self._calculate_average_fcf(list(fcf_values.values()))
-        fcf_yield = self._calculate_fcf_yield(average_fcf, record.enterprise_value)
-        
-        # Update the database
         with self._get_connection() as conn:
-            conn.execute(f"""
-                UPDATE stock_financials 
-                SET fcf_{year} = ?, average_fcf = ?, fcf_yield = ?, last_updated = ?
-                WHERE ticker = ?
-            """, (value, average_fcf, fcf_yield, datetime.now().isoformat(), ticker.upper()))
+            cursor = conn.execute(self._update_fcf_sql[year], {
+                "value": value,
+                "now": datetime.now().isoformat(),
+                "ticker": ticker.upper(),
+            })
             conn.commit()
         
-        return True
+        return cursor.rowcount > 0
     
     def update_enterprise_value(self, ticker: str, value: Optional[float]) -> bool:
         """
@@ -341,6 +393,126 @@ class StockDatabase:
         
         return True
     
+    def update_enterprise_values(self, values: dict[str, Optional[float]]) -> int:
+        """
+        Update enterprise values for many tickers in a single transaction.
+        Automatically recalculates fcf_yield for each updated ticker.
+        
+        Args:
+            values: Mapping of ticker symbol to new enterprise value
+        
+        Returns:
+            Number of tickers updated
+        """
+        if not values:
+            return 0
+        
+        now = datetime.now().isoformat()
+        
+        with self._get_connection() as conn:
+            # Take the write lock before reading, so a concurrent FCF update
+            # can't change average_fcf between the read and the write
+            conn.execute("BEGIN IMMEDIATE")
+            averages = dict(conn.execute("SELECT ticker, average_fcf FROM stock_financials"))
+            rows = [
+                (value, self._calculate_fcf_yield(averages[ticker], value), now, ticker)
+                for ticker, value in ((t.upper(), v) for t, v in values.items())
+                if ticker in averages
+            ]
+            conn.executemany("""
+                UPDATE stock_financials
+                SET enterprise_value = ?, fcf_yield = ?, last_updated = ?
+                WHERE ticker = ?
+            """, rows)
+            conn.commit()
+        
+        return len(rows)
+    
+    def update_fcf_many(self, values: dict[str, FreeCashFlowData]) -> int:
+        """
+        Update FCF values for many tickers in a single transaction, then
+        recalculate average_fcf and fcf_yield for all stocks in one pass.
+        Years that are None in the new data keep their stored value.
+        
+        Args:
+            values: Mapping of ticker symbol to newly fetched FCF data
+        
+        Returns:
+            Number of tickers updated
+        """
+        now = datetime.now().isoformat()
+        rows = [
+            (*fcf.values(), now, ticker.upper())
+            for ticker, fcf in values.items()
+            if any(value is not None for value in fcf.values())
+        ]
+        if not rows:
+            return 0
+        
+        with self._get_connection() as conn:
+            cursor = conn.executemany("""
+                UPDATE stock_financials
+                SET fcf_2025 = COALESCE(?, fcf_2025),
+                    fcf_2024 = COALESCE(?, fcf_2024),
+                    fcf_2023 = COALESCE(?, fcf_2023),
+                    fcf_2022 = COALESCE(?, fcf_2022),
+                    fcf_2021 = COALESCE(?, fcf_2021),
+                    last_updated = ?
+                WHERE ticker = ?
+            """, rows)
+            updated = cursor.rowcount
+            conn.commit()
+        
+        self.recompute_all_derived()
+        return updated
+    
+    def recompute_all_derived(self) -> int:
+        """
+        Recalculate average_fcf and fcf_yield for every stock.
+        
+        Applies the same rules as _calculate_average_fcf/_calculate_fcf_yield,
+        but over all rows at once as NumPy array operations instead of one
+        Python call (and one UPDATE round trip) per ticker.
+        
+        Returns:
+            Number of stocks recalculated
+        """
+        fcf_columns = [f"fcf_{year}" for year in self.FCF_YEARS]
+        
+        with self._get_connection() as conn:
+            # Take the write lock before reading, so a concurrent enterprise
+            # value update can't be overwritten with a yield from the old value
+            conn.execute("BEGIN IMMEDIATE")
+            df = pd.read_sql_query(
+                f"SELECT ticker, {', '.join(fcf_columns)}, enterprise_value FROM stock_financials",
+                conn
+            )
+            
+            fcf = df[fcf_columns].to_numpy(dtype=np.float64)
+            enterprise_value = df["enterprise_value"].to_numpy(dtype=np.float64)
+            
+            average_fcf = average_fcf_batch(fcf)
+            
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fcf_yield = np.where(enterprise_value > 0, average_fcf / enterprise_value, np.nan)
+            
+            # round() on Python floats keeps results identical to _calculate_fcf_yield
+            rows = [
+                (
+                    None if np.isnan(avg) else avg,
+                    None if np.isnan(yld) else round(yld, 3),
+                    ticker,
+                )
+                for ticker, avg, yld in zip(df["ticker"], average_fcf.tolist(), fcf_yield.tolist())
+            ]
+            conn.executemany(
+                "UPDATE stock_financials SET average_fcf = ?, fcf_yield = ? WHERE ticker = ?",
+                rows
+            )
+            conn.commit()
+        
+        return len(rows)
+    
     def delete(self, ticker: str) -> bool:
         """
         Delete a stock record.
@@ -365,3 +537,13 @@ class StockDatabase:
             conn.execute("DELETE FROM stock_financials")
             conn.commit()
 
+
+@functools.lru_cache(maxsize=None)
+def _shared_db(read_only: bool) -> StockDatabase:
+    return StockDatabase(read_only=read_only)
+
+
+def get_db(*, read_only: bool = False) -> StockDatabase:
+    """Get the shared StockDatabase (read-write or read-only) for the default database path."""
+    # Always call the cache the same way, so there is exactly one instance per mode
+    return _shared_db(bool(read_only))
@@ -5,11 +5,42 @@ Uses Stock and StockDatabase classes for clean OOP design.
 """
 
 import argparse
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from database import StockDatabase
+from database import get_db
 from stock import Stock, ValueFormatter
-from ticker_resolver import TickerResolver
+from ticker_resolver import get_default_resolver
+
+
+class RateLimiter:
+    """
+    Spaces out calls across threads so that at most one starts per interval.
+    
+    Usage:
+        limiter = RateLimiter(0.5)
+        limiter.wait()  # Blocks until this caller's slot comes up
+    """
+    
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval: Minimum time between call starts in seconds
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+    
+    def wait(self):
+        """Block until the caller may start its call."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        
+        if start > now:
+            time.sleep(start - now)
 
 
 class StockIngestion:
@@ -22,16 +53,20 @@ class StockIngestion:
         ingestion.run()          # Ingest all tickers
     """
     
-    def __init__(self, delay: float = 0.5):
+    BATCH_SIZE = 100
+    
+    def __init__(self, delay: float = 0.5, workers: int = 8):
         """
         Initialize ingestion with dependencies.
         
         Args:
             delay: Delay between API calls in seconds (rate limiting)
+            workers: Number of tickers fetched concurrently
         """
         self.delay = delay
-        self.resolver = TickerResolver()
-        self.db = StockDatabase()
+        self.workers = workers
+        self.resolver = get_default_resolver()
+        self.db = get_db()
     
     def ingest_single(self, ticker: str, company_name: str) -> bool:
         """
@@ -74,31 +109,49 @@ class StockIngestion:
         
         success_count = 0
         error_count = 0
+        pending = []
         fmt = ValueFormatter.format_large_number
+        limiter = RateLimiter(self.delay)
         
-        for i, company in enumerate(companies, 1):
-            ticker = company.ticker
-            name = company.title
-            
-            print(f"[{i}/{total}] Processing {ticker} ({name})...", end=" ")
+        def fetch(ticker: str) -> dict:
+            limiter.wait()
+            return Stock(ticker).get_all_data()
+        
+        # Fetches overlap on the worker threads (paced by the rate limiter);
+        # this thread formats results and writes them in batches as they complete
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {executor.submit(fetch, company.ticker): company for company in companies}
             
-            try:
-                stock = Stock(ticker)
-                data = stock.get_all_data()
-                self.db.upsert(data, name)
+            for i, future in enumerate(as_completed(futures), 1):
+                company = futures[future]
+                ticker = company.ticker
+                name = company.title
                 
-                ev = fmt(data["enterprise_value"])
-                fcf = fmt(data["fcf_2025"])
-                print(f"✓ EV: {ev}, FCF 2025: {fcf}")
-                success_count += 1
+                print(f"[{i}/{total}] Processing {ticker} ({name})...", end=" ")
                 
-            except Exception as e:
-                print(f"✗ Error: {e}")
-                error_count += 1
-            
-            # Rate limiting
-            if i < total:
-                time.sleep(self.delay)
+                try:
+                    data = future.result()
+                    pending.append((data, name))
+                    
+                    ev = fmt(data["enterprise_value"])
+                    fcf = fmt(data["fcf_2025"])
+                    print(f"✓ EV: {ev}, FCF 2025: {fcf}")
+                    success_count += 1
+                
+                except Exception as e:
+                    print(f"✗ Error: {e}")
+                    error_count += 1
+                
+                # Write in batches: one transaction per BATCH_SIZE stocks
+                if len(pending) >= self.BATCH_SIZE:
+                    self.db.upsert_many(pending)
+                    pending = []
+        finally:
+            # On an error or Ctrl-C, keep the rows already fetched and drop the
+            # queued fetches instead of running them all before exiting
+            self.db.upsert_many(pending)
+            executor.shutdown(cancel_futures=True)
         
         print("=" * 70)
         print(f"\nIngestion complete!")
@@ -133,7 +186,7 @@ def interactive_mode():
         except ValueError:
             print("Invalid number.")
     elif choice == "3":
-        db = StockDatabase()
+        db = get_db()
         count = db.count()
         print(f"\nDatabase contains {count} stock records.")
         print(f"Location: {db.db_path}")
@@ -176,6 +229,7 @@ def main():
     parser.add_argument("--ticker", type=str, help="Ingest a single ticker")
     parser.add_argument("--limit", type=int, help="Limit number of tickers to process")
     parser.add_argument("--delay", type=float, default=0.5, help="Delay between API calls (seconds)")
+    parser.add_argument("--workers", type=int, default=8, help="Number of tickers fetched concurrently")
     parser.add_argument("--interactive", action="store_true", help="Run interactive menu")
     
     args = parser.parse_args()
@@ -186,7 +240,7 @@ def main():
         interactive_mode()
     else:
         # Default: run ingestion
-        ingestion = StockIngestion(delay=args.delay)
+        ingestion = StockIngestion(delay=args.delay, workers=args.workers)
         ingestion.run(limit=args.limit)
 
 
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Scheduled jobs to refresh EV daily and FCF every 2 months.
+
+The scheduler persists jobs by textual reference ("jobs:<function>"), so the
+job functions live here rather than in app.py: resolving a reference to the
+entry-point module would import it a second time and start a second scheduler.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Iterator, Optional
+
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from database import get_db
+from ranking import invalidate_top_stocks
+from stock import Stock
+
+# Yahoo Finance calls are network-bound, so a small pool overlaps their latency
+MAX_FETCH_WORKERS = 8
+
+JOBS_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.db")
+
+# Job id -> trigger. Each job runs the function of the same name in this module.
+JOB_TRIGGERS = {
+    'refresh_enterprise_values': CronTrigger(hour=22, minute=0),  # 10 PM daily
+    'refresh_fcf_values': CronTrigger(month='1,3,5,7,9,11', day=1, hour=22, minute=30),  # Every 2 months
+}
+
+
+def _fetch_concurrently(tickers: list[str], fetch: Callable[[Stock], Any]) -> Iterator[tuple[str, Any, Optional[Exception]]]:
+    """
+    Run a Yahoo Finance fetch for every ticker on a shared thread pool.
+    
+    Results are yielded on the calling thread as they complete, so callers
+    can write them to the database without sharing connections across threads.
+    
+    Args:
+        tickers: Ticker symbols to fetch
+        fetch: Function taking a Stock and returning the fetched value
+    
+    Yields:
+        (ticker, result, error) tuples; error is None on success
+    """
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        futures = {
+            executor.submit(fetch, Stock(ticker)): ticker
+            for ticker in tickers
+        }
+        for future in as_completed(futures):
+            error = future.exception()
+            result = future.result() if error is None else None
+            yield futures[future], result, error
+
+
+def refresh_enterprise_values():
+    """Fetch latest enterprise values from Yahoo Finance and update database."""
+    print(f"\n[{datetime.now()}] Starting daily EV refresh...")
+    db = get_db()
+    tickers = [record.ticker for record in db.get_all()]
+    
+    new_values = {}
+    errors = 0
+    
+    # Read info directly rather than via get_enterprise_value, which hides
+    # fetch errors as None; failed tickers must be counted as errors
+    for ticker, new_ev, error in _fetch_concurrently(tickers, lambda stock: stock.info.get("enterpriseValue")):
+        if error is not None:
+            print(f"  Error updating {ticker}: {error}")
+            errors += 1
+        elif new_ev is not None:
+            new_values[ticker] = new_ev
+    
+    # Write all updates in one transaction instead of one commit per ticker
+    success = db.update_enterprise_values(new_values)
+    invalidate_top_stocks()
+    
+    print(f"[{datetime.now()}] EV refresh complete: {success} updated, {errors} errors")
+
+
+def refresh_fcf_values():
+    """Fetch latest FCF values from Yahoo Finance and update database."""
+    print(f"\n[{datetime.now()}] Starting bi-monthly FCF refresh...")
+    db = get_db()
+    tickers = [record.ticker for record in db.get_all()]
+    
+    new_values = {}
+    errors = 0
+    
+    for ticker, fcf_data, error in _fetch_concurrently(tickers, Stock.get_free_cash_flow):
+        if error is not None:
+            print(f"  Error updating FCF for {ticker}: {error}")
+            errors += 1
+        else:
+            new_values[ticker] = fcf_data
+    
+    # One batched write, then a single vectorized recalculation of averages/yields
+    success = db.update_fcf_many(new_values)
+    invalidate_top_stocks()
+    
+    print(f"[{datetime.now()}] FCF refresh complete: {success} updated, {errors} errors")
+
+
+def start_scheduler() -> BackgroundScheduler:
+    """
+    Start the background scheduler running the refresh jobs.
+    
+    Jobs are persisted so a run missed while the app was down still fires on
+    restart (within the grace period), and each job never overlaps a
+    still-running copy of itself. There are only two jobs, each doing its own
+    fan-out, so the scheduler needs just one thread per job rather than
+    APScheduler's default pool of 10.
+    
+    Returns:
+        The running scheduler
+    """
+    scheduler = BackgroundScheduler(
+        jobstores={'default': SQLAlchemyJobStore(url=f"sqlite:///{JOBS_DB_PATH}", tablename='refresh_jobs')},
+        executors={'default': {'type': 'threadpool', 'max_workers': 2}},
+        job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': 3600},
+    )
+    
+    # Start paused so the stored jobs can be reconciled before anything runs.
+    # Re-adding a stored job would recompute next_run_time from now and drop a
+    # run missed while the app was down, so existing jobs are only rescheduled
+    # when their trigger no longer matches JOB_TRIGGERS.
+    scheduler.start(paused=True)
+    for job_id, trigger in JOB_TRIGGERS.items():
+        job = scheduler.get_job(job_id)
+        if job is None:
+            scheduler.add_job(f"jobs:{job_id}", trigger, id=job_id)
+        elif str(job.trigger) != str(trigger) or job.trigger.timezone != trigger.timezone:
+            scheduler.reschedule_job(job_id, trigger=trigger)
+    scheduler.resume()
+    return scheduler
@@ -5,8 +5,8 @@ CLI script to lookup stock financial data from the database.
 
 import argparse
 
-from database import StockDatabase
-from ticker_resolver import TickerResolver
+from database import get_db
+from ticker_resolver import get_default_resolver
 
 
 def lookup(ticker: str):
@@ -16,7 +16,7 @@ def lookup(ticker: str):
     Args:
         ticker: Stock ticker symbol
     """
-    db = StockDatabase()
+    db = get_db()
     record = db.get(ticker)
     
     if record:
@@ -52,7 +52,7 @@ def main():
         user_input = args.ticker
     
     # Resolve input to ticker
-    resolver = TickerResolver()
+    resolver = get_default_resolver()
     ticker = resolver.resolve(user_input)
     
     if ticker != user_input.upper():
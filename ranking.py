@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Cached ranking of the top stocks by FCF yield, as shown on the index page.
+"""
+
+import time
+from typing import Optional
+
+from database import StockRecord, get_db
+from stock import ValueFormatter
+
+# The ranking only changes when a refresh job runs, so the index page serves
+# it from memory; the jobs invalidate the cache when they finish.
+TOP_STOCKS_LIMIT = 30
+TOP_STOCKS_CACHE_TTL = 3600  # seconds
+_top_stocks_cache: Optional[tuple[float, list[dict], int]] = None
+
+
+def _format_stock_row(stock: StockRecord) -> dict:
+    """Pre-format a stock's values for the index template."""
+    fmt = ValueFormatter.format_large_number
+    return {
+        "ticker": stock.ticker,
+        "company_name": stock.company_name,
+        "fcf_yield": f"{stock.fcf_yield:.3f}",
+        "average_fcf": fmt(stock.average_fcf),
+        "enterprise_value": fmt(stock.enterprise_value),
+        "last_updated": stock.last_updated,
+    }
+
+
+def get_top_stocks() -> tuple[list[dict], int]:
+    """
+    Get the top stocks by FCF yield, formatted for display, and the total stock count.
+    
+    Formatting happens once per cache fill rather than inside the template
+    on every render.
+    
+    Returns:
+        (top stock rows, total stocks), served from memory for up to TOP_STOCKS_CACHE_TTL seconds
+    """
+    global _top_stocks_cache
+    
+    cached = _top_stocks_cache
+    if cached is not None and time.monotonic() - cached[0] < TOP_STOCKS_CACHE_TTL:
+        return cached[1], cached[2]
+    
+    db = get_db(read_only=True)
+    stocks = [_format_stock_row(stock) for stock in db.get_top_by_yield(limit=TOP_STOCKS_LIMIT)]
+    total_stocks = db.count()
+    _top_stocks_cache = (time.monotonic(), stocks, total_stocks)
+    return stocks, total_stocks
+
+
+def invalidate_top_stocks():
+    """Drop the cached ranking so the next page view reads fresh data."""
+    global _top_stocks_cache
+    _top_stocks_cache = None
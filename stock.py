@@ -3,13 +3,159 @@
 Stock class for fetching financial data from Yahoo Finance.
 """
 
+import asyncio
+import os
+import pickle
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from datetime import date
+from typing import Any, Callable, Optional, TypeVar
 
+import numpy as np
+import pandas as pd
 import yfinance as yf
+from yfinance.exceptions import YFException, YFRateLimitError
 
+T = TypeVar("T")
 
-@dataclass
+# Yahoo answers bursts of concurrent requests with HTTP 429, so all Stock
+# instances share a cap on in-flight requests and back off when rate limited
+MAX_CONCURRENT_REQUESTS = 8
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF = 1.0  # seconds, doubled on each retry
+
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# By default yfinance swallows request errors, including YFRateLimitError, and
+# returns an empty statement instead. Let them raise, so _fetch_with_retry can
+# back off and retry every kind of fetch, and callers' error handling sees them.
+yf.config.debug.hide_exceptions = False
+
+# Marks a memoized value that has not been computed yet (None is a valid result)
+_UNSET = object()
+
+
+def _fetch_with_retry(fetch: Callable[[], T]) -> T:
+    """
+    Run a Yahoo Finance request, retrying with exponential backoff and jitter
+    if Yahoo rate-limits it.
+    
+    Args:
+        fetch: Function performing the request
+    
+    Returns:
+        Whatever fetch returns
+    """
+    for attempt in range(RATE_LIMIT_RETRIES):
+        try:
+            with _request_slots:
+                return fetch()
+        except YFRateLimitError:
+            if attempt == RATE_LIMIT_RETRIES - 1:
+                raise
+            delay = RATE_LIMIT_BACKOFF * 2 ** attempt
+            time.sleep(delay + random.uniform(0, delay))
+
+
+class YahooCache:
+    """
+    On-disk cache of Yahoo Finance responses, valid for the current day.
+    
+    Within a trading day the cash flow statements and enterprise value are
+    effectively constant, so repeat runs can skip the network entirely.
+    Entries are pickled to <directory>/<YYYY-MM-DD>/<TICKER>.<kind>.pkl;
+    earlier days' directories are removed when a new day starts (anything
+    else in the directory is left alone).
+    
+    Usage:
+        cache = YahooCache()
+        cache.set("AAPL", "info", info)
+        info = cache.get("AAPL", "info")  # None on a miss
+    """
+    
+    DEFAULT_DIRECTORY = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        ".yfcache"
+    )
+    
+    # Names of the per-day directories; the only entries _remove_old_days deletes
+    _DAY_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+    
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Args:
+            directory: Cache directory. Uses default if not provided.
+        """
+        self.directory = directory or self.DEFAULT_DIRECTORY
+    
+    def _day_directory(self) -> str:
+        return os.path.join(self.directory, date.today().isoformat())
+    
+    def get(self, ticker: str, kind: str) -> Optional[Any]:
+        """
+        Get today's cached value, or None if there is none.
+        
+        Args:
+            ticker: Stock ticker symbol
+            kind: Response kind (e.g. "info", "cash_flow")
+        """
+        path = os.path.join(self._day_directory(), f"{ticker}.{kind}.pkl")
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+    
+    def set(self, ticker: str, kind: str, value: Any):
+        """
+        Store a value for today. Failures to write are ignored.
+        
+        Args:
+            ticker: Stock ticker symbol
+            kind: Response kind (e.g. "info", "cash_flow")
+            value: Picklable response (dict or DataFrame)
+        """
+        day_directory = self._day_directory()
+        try:
+            if not os.path.isdir(day_directory):
+                self._remove_old_days()
+                os.makedirs(day_directory, exist_ok=True)
+            
+            # Write to a uniquely named temporary file first so readers never see a
+            # partial entry, even with several threads or processes writing it
+            path = os.path.join(day_directory, f"{ticker}.{kind}.pkl")
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=day_directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError:
+            pass
+    
+    def _remove_old_days(self):
+        """Delete cache directories from previous days."""
+        if not os.path.isdir(self.directory):
+            return
+        today = date.today().isoformat()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name != today and self._DAY_PATTERN.fullmatch(name) and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+_default_cache = YahooCache()
+
+
+@dataclass(slots=True)
 class FreeCashFlowData:
     """Container for annual free cash flow data."""
     fcf_2025: Optional[float] = None
@@ -18,6 +164,10 @@ class FreeCashFlowData:
     fcf_2022: Optional[float] = None
     fcf_2021: Optional[float] = None
     
+    def values(self) -> tuple[Optional[float], ...]:
+        """Get the FCF values in field order (newest year first), without building a dict."""
+        return (self.fcf_2025, self.fcf_2024, self.fcf_2023, self.fcf_2022, self.fcf_2021)
+    
     def to_dict(self) -> dict[str, Optional[float]]:
         return {
             "2025": self.fcf_2025,
@@ -29,8 +179,13 @@ class FreeCashFlowData:
     
     def __iter__(self):
         """Iterate over years and values."""
-        for year, value in self.to_dict().items():
-            yield year, value
+        return iter((
+            ("2025", self.fcf_2025),
+            ("2024", self.fcf_2024),
+            ("2023", self.fcf_2023),
+            ("2022", self.fcf_2022),
+            ("2021", self.fcf_2021),
+        ))
     
     def calculate_average(self) -> Optional[float]:
         """
@@ -42,21 +197,39 @@ class FreeCashFlowData:
         Returns:
             Average FCF or None if any value is negative or no data
         """
-        values = [self.fcf_2025, self.fcf_2024, self.fcf_2023, self.fcf_2022, self.fcf_2021]
-        
-        # Filter out None values
-        valid_values = [v for v in values if v is not None]
-        
-        # If no valid values, return None
-        if not valid_values:
-            return None
-        
-        # If any value is negative, return None
-        if any(v < 0 for v in valid_values):
-            return None
+        # Single pass over the fields: stop at the first negative value
+        total = 0
+        count = 0
+        for value in self.values():
+            if value is None:
+                continue
+            if value < 0:
+                return None
+            total += value
+            count += 1
         
-        # Calculate average of positive values
-        return sum(valid_values) / len(valid_values)
+        return total / count if count else None
+
+
+def average_fcf_batch(fcf: np.ndarray) -> np.ndarray:
+    """
+    Calculate average FCF for many stocks at once, with the same rules as
+    FreeCashFlowData.calculate_average.
+    
+    Args:
+        fcf: 2D float array, one row per stock and one column per year,
+             with NaN for missing values
+    
+    Returns:
+        1D array of averages, NaN where calculate_average would return None
+    """
+    valid = ~np.isnan(fcf)
+    filled = np.where(valid, fcf, 0.0)
+    valid_count = valid.sum(axis=1)
+    has_negative = (filled < 0).any(axis=1)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where((valid_count > 0) & ~has_negative, filled.sum(axis=1) / valid_count, np.nan)
 
 
 class Stock:
@@ -69,20 +242,85 @@ class Stock:
         fcf = stock.get_free_cash_flow()
     """
     
-    TARGET_YEARS = [2025, 2024, 2023, 2022, 2021]
+    TARGET_YEARS = frozenset({2025, 2024, 2023, 2022, 2021})
+    # FreeCashFlowData field for each target year, so the parse loop needs no string formatting
+    _YEAR_FIELDS = {year: f"fcf_{year}" for year in TARGET_YEARS}
+    BULK_CHUNK_SIZE = 20
     
-    def __init__(self, ticker: str):
+    def __init__(self, ticker: str, use_cache: bool = True):
         """
         Initialize Stock with a ticker symbol.
         
         Args:
             ticker: Stock ticker symbol (e.g., "AAPL", "NVDA")
+            use_cache: Reuse Yahoo Finance responses already fetched today (see YahooCache)
         """
         self.ticker = ticker.upper().strip()
+        self._cache: Optional[YahooCache] = _default_cache if use_cache else None
         self._yf_ticker: Optional[yf.Ticker] = None
         self._info: Optional[dict] = None
         self._cash_flow = None
         self._quarterly_cash_flow = None
+        self._enterprise_value: Any = _UNSET
+        self._free_cash_flow: Optional[FreeCashFlowData] = None
+    
+    @classmethod
+    def bulk_fetch(cls, tickers: list[str], chunk_size: Optional[int] = None) -> list["Stock"]:
+        """
+        Create Stocks for many tickers with their Yahoo Finance data preloaded.
+        
+        Tickers are processed in chunks: each chunk shares one yf.Tickers
+        object, and the info and cash flow statements for all of its symbols
+        are fetched concurrently. Failed fetches are left unloaded and retried
+        lazily on first access, as with a single Stock.
+        
+        Args:
+            tickers: Ticker symbols to fetch
+            chunk_size: Symbols per chunk (defaults to BULK_CHUNK_SIZE)
+        
+        Returns:
+            List of Stock objects, in the same order as tickers
+        """
+        chunk_size = chunk_size or cls.BULK_CHUNK_SIZE
+        stocks = [cls(ticker) for ticker in tickers]
+        
+        for start in range(0, len(stocks), chunk_size):
+            chunk = stocks[start:start + chunk_size]
+            yf_tickers = yf.Tickers(" ".join(stock.ticker for stock in chunk))
+            for stock in chunk:
+                stock._yf_ticker = yf_tickers.tickers.get(stock.ticker)
+            
+            with ThreadPoolExecutor(max_workers=len(chunk)) as executor:
+                list(executor.map(cls._prefetch, chunk))
+        
+        return stocks
+    
+    def _prefetch(self):
+        """Load info and cash flow statements, leaving any that fail for lazy retry."""
+        for load in (lambda: self.info, lambda: self.cash_flow, lambda: self.quarterly_cash_flow):
+            try:
+                load()
+            except Exception:
+                pass
+    
+    async def afetch_all(self) -> "Stock":
+        """
+        Load info and both cash flow statements concurrently, for use from asyncio code.
+        
+        The three requests are independent, so they run in parallel worker
+        threads. Failed loads are left for lazy retry on first access.
+        
+        Returns:
+            This Stock, with its data preloaded
+        """
+        _ = self.yf_ticker  # Create the Ticker once, before the threads share it
+        await asyncio.gather(
+            asyncio.to_thread(lambda: self.info),
+            asyncio.to_thread(lambda: self.cash_flow),
+            asyncio.to_thread(lambda: self.quarterly_cash_flow),
+            return_exceptions=True
+        )
+        return self
     
     @property
     def yf_ticker(self) -> yf.Ticker:
@@ -91,25 +329,65 @@ class Stock:
             self._yf_ticker = yf.Ticker(self.ticker)
         return self._yf_ticker
     
+    @staticmethod
+    def _has_data(value: Any) -> bool:
+        """
+        Check that a Yahoo Finance response holds real data, rather than the
+        empty statement or near-empty info dict yfinance returns when a
+        request fails.
+        """
+        if isinstance(value, pd.DataFrame):
+            return not value.empty
+        if isinstance(value, dict):
+            # yfinance only sets "symbol" when Yahoo returned a quote for the ticker
+            return "symbol" in value
+        return value is not None
+    
+    def _load(self, kind: str, fetch: Callable[[], T]) -> T:
+        """Get a Yahoo Finance response from today's cache, fetching and caching it on a miss."""
+        if self._cache is not None:
+            cached = self._cache.get(self.ticker, kind)
+            if cached is not None and self._has_data(cached):
+                return cached
+        
+        value = _fetch_with_retry(fetch)
+        # Never cache a failed or empty response: it would stick for the rest of the day
+        if self._cache is not None and self._has_data(value):
+            self._cache.set(self.ticker, kind, value)
+        return value
+    
+    def _fetch_info(self) -> dict:
+        """Request stock info, failing rather than returning None."""
+        try:
+            info = self.yf_ticker.info
+            if info is None:
+                raise YFException(f"{self.ticker}: no info returned")
+        except Exception:
+            # yfinance marks info as fetched before requesting it, so the same
+            # Ticker would answer a retry with None and no request; use a fresh one
+            self._yf_ticker = None
+            raise
+        return info
+    
     @property
     def info(self) -> dict:
         """Lazy-load stock info."""
         if self._info is None:
-            self._info = self.yf_ticker.info
+            self._info = self._load("info", self._fetch_info)
         return self._info
     
     @property
     def cash_flow(self):
         """Lazy-load annual cash flow statement."""
         if self._cash_flow is None:
-            self._cash_flow = self.yf_ticker.cash_flow
+            self._cash_flow = self._load("cash_flow", lambda: self.yf_ticker.cash_flow)
         return self._cash_flow
     
     @property
     def quarterly_cash_flow(self):
         """Lazy-load quarterly cash flow statement."""
         if self._quarterly_cash_flow is None:
-            self._quarterly_cash_flow = self.yf_ticker.quarterly_cash_flow
+            self._quarterly_cash_flow = self._load("quarterly_cash_flow", lambda: self.yf_ticker.quarterly_cash_flow)
         return self._quarterly_cash_flow
     
     def get_enterprise_value(self) -> Optional[float]:
@@ -119,10 +397,15 @@ class Stock:
         Returns:
             Enterprise value as float, or None if not available.
         """
+        if self._enterprise_value is not _UNSET:
+            return self._enterprise_value
+        
         try:
-            return self.info.get("enterpriseValue")
+            self._enterprise_value = self.info.get("enterpriseValue")
         except Exception:
+            # Not memoized, so a later call retries the fetch
             return None
+        return self._enterprise_value
     
     def _calculate_ttm_fcf(self) -> Optional[float]:
         """Calculate TTM Free Cash Flow from quarterly data (sum of last 4 quarters)."""
@@ -132,16 +415,10 @@ class Stock:
             if "Free Cash Flow" not in self.quarterly_cash_flow.index:
                 return None
             
-            fcf_row = self.quarterly_cash_flow.loc["Free Cash Flow"]
-            valid_quarters = []
-            
-            for col in self.quarterly_cash_flow.columns[:4]:
-                val = fcf_row[col]
-                if val is not None and not (isinstance(val, float) and val != val):
-                    valid_quarters.append(val)
-            
-            if len(valid_quarters) == 4:
-                return sum(valid_quarters)
+            # Only the latest four quarters are needed, so slice before converting
+            quarters = self.quarterly_cash_flow.loc["Free Cash Flow"].iloc[:4].to_numpy(dtype=np.float64)
+            if len(quarters) == 4 and not np.isnan(quarters).any():
+                return float(quarters.sum())
             return None
         except Exception:
             return None
@@ -151,22 +428,30 @@ class Stock:
         Fetch annual free cash flow data.
         If 2025 data is not available, uses TTM (sum of last 4 quarters).
         
+        The result is memoized once the statements it depends on have loaded,
+        so repeat calls return the same object without re-parsing them.
+        
         Returns:
             FreeCashFlowData object with FCF for each year.
         """
+        if self._free_cash_flow is not None:
+            return self._free_cash_flow
+        
         result = FreeCashFlowData()
         
         try:
             # Get annual FCF
             if not self.cash_flow.empty and "Free Cash Flow" in self.cash_flow.index:
-                fcf_row = self.cash_flow.loc["Free Cash Flow"]
+                # Pull the row and the column years out once as arrays instead
+                # of a label lookup per column
+                years = pd.DatetimeIndex(self.cash_flow.columns).year.to_numpy()
+                values = self.cash_flow.loc["Free Cash Flow"].to_numpy(dtype=np.float64)
+                valid = ~np.isnan(values)
                 
-                for col in self.cash_flow.columns:
-                    year = col.year
-                    if year in self.TARGET_YEARS:
-                        value = fcf_row[col]
-                        if value is not None and not (isinstance(value, float) and value != value):
-                            setattr(result, f"fcf_{year}", value)
+                for year, value in zip(years[valid].tolist(), values[valid].tolist()):
+                    field = self._YEAR_FIELDS.get(year)
+                    if field is not None:
+                        setattr(result, field, value)
             
             # If 2025 is not available, use TTM
             if result.fcf_2025 is None:
@@ -177,6 +462,9 @@ class Stock:
         except Exception:
             pass
         
+        # Don't memoize a result missing data only because a fetch failed
+        if self._cash_flow is not None and (result.fcf_2025 is not None or self._quarterly_cash_flow is not None):
+            self._free_cash_flow = result
         return result
     
     def get_all_data(self) -> dict:
@@ -205,6 +493,80 @@ class Stock:
         return self.ticker
 
 
+def get_all_data_bulk(tickers: list[str]) -> list[dict]:
+    """
+    Fetch all financial data for many tickers (see Stock.get_all_data).
+    
+    Args:
+        tickers: Ticker symbols to fetch
+    
+    Returns:
+        List of data dictionaries, in the same order as tickers
+    """
+    stocks = Stock.bulk_fetch(tickers)
+    fcf_data = [stock.get_free_cash_flow() for stock in stocks]
+    
+    # Averages for the whole batch in one vectorized pass
+    matrix = np.array(
+        [fcf.values() for fcf in fcf_data],
+        dtype=np.float64
+    ).reshape(len(fcf_data), 5)
+    averages = average_fcf_batch(matrix).tolist()
+    
+    return [
+        {
+            "ticker": stock.ticker,
+            "enterprise_value": stock.get_enterprise_value(),
+            "fcf_2025": fcf.fcf_2025,
+            "fcf_2024": fcf.fcf_2024,
+            "fcf_2023": fcf.fcf_2023,
+            "fcf_2022": fcf.fcf_2022,
+            "fcf_2021": fcf.fcf_2021,
+            "average_fcf": None if np.isnan(average) else average,
+        }
+        for stock, fcf, average in zip(stocks, fcf_data, averages)
+    ]
+
+
+def fetch_all_data_parallel(tickers: list[str], workers: int = MAX_CONCURRENT_REQUESTS) -> list[dict]:
+    """
+    Fetch all financial data for many tickers on a thread pool, one Stock per ticker.
+    
+    Unlike get_all_data_bulk, tickers are not grouped into chunks, so results
+    can be consumed as a plain map. Requests still share the
+    MAX_CONCURRENT_REQUESTS cap, so more workers than that only queue.
+    
+    Args:
+        tickers: Ticker symbols to fetch
+        workers: Number of worker threads
+    
+    Returns:
+        List of data dictionaries, in the same order as tickers
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda ticker: Stock(ticker).get_all_data(), tickers))
+
+
+async def fetch_many(tickers: list[str], concurrency: int = 16) -> list[Stock]:
+    """
+    Create Stocks for many tickers and preload their data concurrently.
+    
+    Args:
+        tickers: Ticker symbols to fetch
+        concurrency: Maximum number of tickers being fetched at once
+    
+    Returns:
+        List of Stock objects, in the same order as tickers
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def fetch(ticker: str) -> Stock:
+        async with semaphore:
+            return await Stock(ticker).afetch_all()
+    
+    return await asyncio.gather(*(fetch(ticker) for ticker in tickers))
+
+
 class ValueFormatter:
     """Utility class for formatting financial values."""
     
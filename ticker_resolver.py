@@ -3,13 +3,18 @@
 TickerResolver class for resolving company names to ticker symbols.
 """
 
-import json
+import bisect
+import functools
 import os
+import pickle
+import threading
 from dataclasses import dataclass
 from typing import Optional
 
+import orjson
 
-@dataclass
+
+@dataclass(slots=True)
 class Company:
     """Represents a company with its ticker and name."""
     ticker: str
@@ -35,6 +40,16 @@ class TickerResolver:
         "company_tickers.json"
     )
     
+    PREFIX_LENGTH = 3
+    
+    # Attributes saved to (and restored from) the snapshot at cache_path. The
+    # ticker fields are pickled first, so exact ticker lookups can stop reading there.
+    _CACHED_TICKER_FIELDS = ("_tickers", "_ticker_index")
+    _CACHED_FIELDS = ("_titles", "_ciks", "_titles_lower", "_prefix_index")
+    
+    # Ends each ticker and title in the search text, so a match can't span two of them
+    _SEARCH_SEPARATOR = "\x00"
+    
     def __init__(self, json_path: Optional[str] = None):
         """
         Initialize resolver with company data.
@@ -43,43 +58,232 @@ class TickerResolver:
             json_path: Path to company_tickers.json. Uses default if not provided.
         """
         self.json_path = json_path or self.DEFAULT_JSON_PATH
+        # Company data is held column-wise (one list per field); Company
+        # objects are only built for the entries a caller actually gets back
+        self._tickers: Optional[list[str]] = None
+        self._titles: Optional[list[str]] = None
+        self._ciks: Optional[list[Optional[int]]] = None
+        self._titles_lower: Optional[list[str]] = None
+        self._ticker_index: Optional[dict[str, int]] = None
+        self._prefix_index: Optional[dict[str, list[int]]] = None
         self._companies: Optional[list[Company]] = None
         self._ticker_map: Optional[dict[str, Company]] = None
+        self._search_text: Optional[tuple[str, list[int]]] = None
+        self._title_text: Optional[tuple[str, list[int]]] = None
+        # The shared resolver (get_default_resolver) may be first used from
+        # several threads at once; only one of them should load the data
+        self._load_lock = threading.Lock()
+        self._tickers_loaded = False
+        self._loaded = False
+    
+    def _ensure_tickers_loaded(self):
+        """Load just the tickers on first use, from the snapshot if it is current."""
+        if not self._tickers_loaded:
+            with self._load_lock:
+                if not self._tickers_loaded:
+                    if not self._load_cache(tickers_only=True):
+                        self._load_data()
+                        self._loaded = True
+                    self._tickers_loaded = True
+    
+    def _ensure_loaded(self):
+        """Load company data on first use."""
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self._load_data()
+                    self._loaded = True
+                    self._tickers_loaded = True
+    
+    def _company(self, index: int) -> Company:
+        """Get the Company at a position in the data, building it if needed."""
+        if self._companies is not None:
+            return self._companies[index]
+        return Company(
+            ticker=self._tickers[index],
+            title=self._titles[index],
+            cik_str=self._ciks[index]
+        )
     
     @property
     def companies(self) -> list[Company]:
         """Lazy-load company data."""
         if self._companies is None:
-            self._load_data()
+            self._ensure_loaded()
+            self._companies = [self._company(i) for i in range(len(self._tickers))]
         return self._companies
     
     @property
     def ticker_map(self) -> dict[str, Company]:
         """Lazy-load ticker lookup map."""
         if self._ticker_map is None:
-            self._load_data()
+            self._ensure_loaded()
+            companies = self.companies
+            self._ticker_map = {ticker: companies[i] for ticker, i in self._ticker_index.items()}
         return self._ticker_map
     
+    @property
+    def titles_lower(self) -> list[str]:
+        """Lazy-load lowercase company titles, parallel to companies."""
+        self._ensure_loaded()
+        return self._titles_lower
+    
+    @property
+    def prefix_index(self) -> dict[str, list[int]]:
+        """Lazy-load map of title word prefix -> indices of companies with a word starting with it."""
+        self._ensure_loaded()
+        return self._prefix_index
+    
+    @property
+    def search_text(self) -> tuple[str, list[int]]:
+        """
+        Lazy-build the text scanned by search: every lowercase ticker and title,
+        each followed by _SEARCH_SEPARATOR, in company order.
+        
+        Returns:
+            (text, offsets) where offsets[i] is the start of company i's entry
+            and offsets[-1] is len(text)
+        """
+        if self._search_text is None:
+            self._ensure_loaded()
+            sep = self._SEARCH_SEPARATOR
+            entries = [
+                f"{ticker.lower()}{sep}{title_lower}{sep}"
+                for ticker, title_lower in zip(self._tickers, self._titles_lower)
+            ]
+            offsets = [0]
+            for entry in entries:
+                offsets.append(offsets[-1] + len(entry))
+            self._search_text = ("".join(entries), offsets)
+        return self._search_text
+    
+    @property
+    def title_text(self) -> tuple[str, list[int]]:
+        """
+        Lazy-build the text scanned by resolve_many: every lowercase title,
+        each followed by _SEARCH_SEPARATOR, in company order.
+        
+        Returns:
+            (text, offsets) where offsets[i] is the start of company i's title
+            and offsets[-1] is len(text)
+        """
+        if self._title_text is None:
+            self._ensure_loaded()
+            offsets = [0]
+            for title_lower in self._titles_lower:
+                offsets.append(offsets[-1] + len(title_lower) + 1)
+            text = "".join(f"{title_lower}{self._SEARCH_SEPARATOR}" for title_lower in self._titles_lower)
+            self._title_text = (text, offsets)
+        return self._title_text
+    
+    @property
+    def cache_path(self) -> str:
+        """Path of the pickled snapshot of the parsed company data."""
+        return os.path.splitext(self.json_path)[0] + ".pkl"
+    
     def _load_data(self):
-        """Load company data from JSON file."""
-        self._companies = []
-        self._ticker_map = {}
+        """Load company data from the pickled snapshot if it is current, otherwise from the JSON file."""
+        if self._load_cache():
+            return
+        
+        self._parse_json()
+        self._save_cache()
+    
+    def _load_cache(self, tickers_only: bool = False) -> bool:
+        """
+        Restore company data from the snapshot at cache_path.
+        
+        Args:
+            tickers_only: Only restore the ticker fields, skipping titles and the prefix index
+        
+        Returns:
+            True if loaded; False if the snapshot is missing, unreadable or older than the JSON file
+        """
+        try:
+            if os.path.getmtime(self.cache_path) < os.path.getmtime(self.json_path):
+                return False
+            with open(self.cache_path, "rb") as f:
+                tickers = pickle.load(f)
+                snapshot = None if tickers_only else pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
         
+        if not isinstance(tickers, dict) or set(tickers) != set(self._CACHED_TICKER_FIELDS):
+            return False
+        if snapshot is not None:
+            if not isinstance(snapshot, dict) or set(snapshot) != set(self._CACHED_FIELDS):
+                return False
+            for name in self._CACHED_FIELDS:
+                setattr(self, name, snapshot[name])
+        for name in self._CACHED_TICKER_FIELDS:
+            setattr(self, name, tickers[name])
+        return True
+    
+    def _save_cache(self):
+        """Write the parsed company data to cache_path. Failures to write are ignored."""
+        if not self._tickers:
+            return
+        
+        tickers = {name: getattr(self, name) for name in self._CACHED_TICKER_FIELDS}
+        snapshot = {name: getattr(self, name) for name in self._CACHED_FIELDS}
+        # Write to a temporary file first so readers never see a partial snapshot
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
         try:
-            with open(self.json_path, "r") as f:
-                data = json.load(f)
-            
-            for entry in data.values():
-                company = Company(
-                    ticker=entry.get("ticker", ""),
-                    title=entry.get("title", ""),
-                    cik_str=entry.get("cik_str")
-                )
-                self._companies.append(company)
-                self._ticker_map[company.ticker.upper()] = company
-                
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+            with open(temp_path, "wb") as f:
+                pickle.dump(tickers, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            pass
+    
+    def _parse_json(self):
+        """Load company data from JSON file."""
+        try:
+            with open(self.json_path, "rb") as f:
+                entries = list(orjson.loads(f.read()).values())
+        except (FileNotFoundError, orjson.JSONDecodeError) as e:
             print(f"Warning: Could not load company data: {e}")
+            entries = []
+        
+        # Tickers are normalized to uppercase once here, so lookups can use them as-is
+        self._tickers = [entry.get("ticker", "").upper() for entry in entries]
+        self._titles = [entry.get("title", "") for entry in entries]
+        self._ciks = [entry.get("cik_str") for entry in entries]
+        self._ticker_index = {ticker: i for i, ticker in enumerate(self._tickers)}
+        self._prefix_index = {}
+        
+        # Lowercase titles once, and index every title word by its first
+        # PREFIX_LENGTH characters, so name lookups avoid a full scan
+        self._titles_lower = [title.lower() for title in self._titles]
+        for i, title in enumerate(self._titles_lower):
+            for prefix in {word[:self.PREFIX_LENGTH] for word in title.split()}:
+                self._prefix_index.setdefault(prefix, []).append(i)
+    
+    def _find_title(self, query_lower: str) -> Optional[int]:
+        """
+        Find the first company (in file order) whose title contains query_lower.
+        
+        The prefix index yields the first company with a title word starting
+        like the query; only titles before it need a substring scan, since
+        the query may also appear mid-word in an earlier title.
+        
+        Returns:
+            Index into companies, or None if no title matches
+        """
+        titles = self.titles_lower
+        words = query_lower.split()
+        end = len(titles)
+        
+        if words and len(words[0]) >= self.PREFIX_LENGTH:
+            for i in self.prefix_index.get(words[0][:self.PREFIX_LENGTH], []):
+                if query_lower in titles[i]:
+                    end = i
+                    break
+        
+        for i in range(end):
+            if query_lower in titles[i]:
+                return i
+        return end if end < len(titles) else None
     
     def resolve(self, user_input: str) -> str:
         """
@@ -99,18 +303,62 @@ class TickerResolver:
         input_upper = user_input.upper()
         input_lower = user_input.lower()
         
-        # Step 1: Exact ticker match
-        if input_upper in self.ticker_map:
-            return self.ticker_map[input_upper].ticker
+        # Step 1: Exact ticker match; needs only the tickers, not the titles
+        self._ensure_tickers_loaded()
+        index = self._ticker_index.get(input_upper)
+        if index is not None:
+            return self._tickers[index]
         
         # Step 2: Partial company name match
-        for company in self.companies:
-            if input_lower in company.title.lower():
-                return company.ticker
+        self._ensure_loaded()
+        index = self._find_title(input_lower)
+        if index is not None:
+            return self._tickers[index]
         
         # No match found - assume valid ticker
         return input_upper
     
+    def resolve_many(self, user_inputs: list[str]) -> list[str]:
+        """
+        Resolve many user inputs to ticker symbols, with the same rules as resolve.
+        
+        Inputs that normalize to the same query (e.g. a watchlist naming a
+        company twice, or "aapl" and " AAPL ") are only resolved once. Name
+        lookups run str.find over title_text, one C-level scan per query,
+        instead of a Python loop over the titles.
+        
+        Args:
+            user_inputs: Ticker symbols or company names
+        
+        Returns:
+            Resolved ticker symbols, in the same order as user_inputs
+        """
+        self._ensure_loaded()
+        text, offsets = self.title_text
+        
+        # resolve() only depends on these two forms of the stripped input
+        resolved: dict[tuple[str, str], str] = {}
+        results = []
+        for user_input in user_inputs:
+            stripped = user_input.strip()
+            key = (stripped.upper(), stripped.lower())
+            ticker = resolved.get(key)
+            if ticker is None:
+                input_upper, input_lower = key
+                index = self._ticker_index.get(input_upper)
+                if index is None:
+                    if self._SEARCH_SEPARATOR in input_lower:
+                        # Could match across titles in the text; scan them one by one
+                        index = self._find_title(input_lower)
+                    else:
+                        # The first match in the text is in the first matching title
+                        position = text.find(input_lower)
+                        if position != -1 and position < len(text):
+                            index = bisect.bisect_right(offsets, position) - 1
+                ticker = resolved[key] = self._tickers[index] if index is not None else input_upper
+            results.append(ticker)
+        return results
+    
     def get_company(self, ticker: str) -> Optional[Company]:
         """
         Get company info by ticker.
@@ -121,7 +369,9 @@ class TickerResolver:
         Returns:
             Company if found, None otherwise
         """
-        return self.ticker_map.get(ticker.upper())
+        self._ensure_loaded()
+        index = self._ticker_index.get(ticker.upper())
+        return self._company(index) if index is not None else None
     
     def search(self, query: str, limit: int = 10) -> list[Company]:
         """
@@ -137,20 +387,46 @@ class TickerResolver:
         query_lower = query.lower()
         results = []
         
-        for company in self.companies:
-            if (query_lower in company.ticker.lower() or 
-                query_lower in company.title.lower()):
-                results.append(company)
-                if len(results) >= limit:
-                    break
+        self._ensure_loaded()
+        if self._SEARCH_SEPARATOR in query_lower:
+            # Could match across entries in the search text; scan them one by one
+            for i, (ticker, title_lower) in enumerate(zip(self._tickers, self._titles_lower)):
+                if (query_lower in ticker.lower() or 
+                    query_lower in title_lower):
+                    results.append(self._company(i))
+                    if len(results) >= limit:
+                        break
+            return results
+        
+        # Find each match with one str.find over the whole text, then map its
+        # position back to the entry containing it and resume at the next entry
+        text, offsets = self.search_text
+        position = 0
+        i = 0
+        while True:
+            position = text.find(query_lower, position)
+            if position == -1 or position >= len(text):
+                break
+            i = bisect.bisect_right(offsets, position, lo=i) - 1
+            results.append(self._company(i))
+            if len(results) >= limit:
+                break
+            i += 1
+            position = offsets[i]
         
         return results
     
     def __len__(self) -> int:
         """Return total number of companies."""
-        return len(self.companies)
+        self._ensure_loaded()
+        return len(self._tickers)
     
     def __iter__(self):
         """Iterate over all companies."""
         return iter(self.companies)
 
+
+@functools.lru_cache(maxsize=1)
+def get_default_resolver() -> TickerResolver:
+    """Get the shared TickerResolver, so company data is loaded once per process."""
+    return TickerResolver()